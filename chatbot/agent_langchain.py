@@ -1,6 +1,9 @@
 import re
+import heapq
+from collections import Counter
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_community.vectorstores import Chroma
+from langchain.schema import Document
 
 TOPIC_SYNONYMS = {
     "cricket": ["cricket", "ipl", "yorker", "wicket", "innings", "overs", "bowled", "siraj", "stokes", "jayasuriya", "pant", "rishabh pant"],
@@ -71,6 +74,7 @@ def detect_and_extract_filters(question: str):
         or "most like" in lower_q  # user's typo still matches
     ):
         filters["most_liked"] = True
+    if "most viewed" in lower_q or "most views" in lower_q: filters["most_viewed"] = True
     if any(word in lower_q for word in ["summarize", "main topic", "what topics", "themes"]): filters["summarize"] = True
     if any(word in lower_q for word in ["most-bookmarked", "most bookmarked", "top users", "most frequent users"]): filters["ranking"] = "user"
     return filters
@@ -110,64 +114,239 @@ def filter_documents(documents, filters, question=""):
         filtered = [d for d in filtered if has_positive(d.page_content)]
     return filtered
 
-def get_most_liked_tweet(documents, topic_search=None):
+def tweet_key(d):
+    # All chunks split from one tweet share its metadata, so the URL (or full text) identifies the tweet
+    return d.metadata.get("tweet_url") or d.metadata.get("content") or d.page_content
+
+def merge_tweets(docs, limit=None):
+    """Collapse chunks into one whole-tweet Document per tweet, keeping first-seen order."""
+    grouped = {}
+    for d in docs:
+        key = tweet_key(d)
+        if key not in grouped:
+            if limit is not None and len(grouped) >= limit:
+                continue
+            grouped[key] = []
+        grouped[key].append(d)
+    return [as_whole_tweet(chunks) for chunks in grouped.values()]
+
+def as_whole_tweet(chunks):
+    meta = chunks[0].metadata
+    text = meta.get("content") or " ".join(c.page_content for c in chunks)
+    return Document(page_content=text, metadata=dict(meta))
+
+# Topics pre-aggregated at ingest, in the same order the most-liked/viewed intents check them
+AGGREGATE_TOPICS = list(AI_KEYWORDS) + list(TOPIC_SYNONYMS.keys())
+AI_PATTERN = re.compile("|".join(rf"\b{k}\b" for k in AI_KEYWORDS), re.IGNORECASE)
+
+def compile_topic_patterns(topic_search):
+    # One alternation per topic for text/author fields, plus the AI fallback applied to tweet text only
+    synonyms = expand_synonyms(topic_search)
+    field_pattern = re.compile("|".join(rf"\b{re.escape(syn)}\b" for syn in synonyms), re.IGNORECASE)
+    return field_pattern, (AI_PATTERN if topic_search in AI_KEYWORDS else None)
+
+TOPIC_PATTERNS = {t: compile_topic_patterns(t) for t in AGGREGATE_TOPICS}
+
+def text_matches_topic(topic_search, text, author="", author_handle=""):
+    field_pattern, ai_pattern = TOPIC_PATTERNS.get(topic_search) or compile_topic_patterns(topic_search)
+    if field_pattern.search("\n".join([text, author, author_handle])):
+        return True
+    return bool(ai_pattern and ai_pattern.search(text))
+
+def matches_topic(d, topic_search):
+    text = (d.page_content or "") + "\n" + str(d.metadata.get("content", "") or "")
+    return text_matches_topic(
+        topic_search, text, str(d.metadata.get("author", "")), str(d.metadata.get("author_handle", ""))
+    )
+
+def get_most_liked_tweet(documents, topic_search=None, metric="likes"):
     candidates = documents
     if topic_search:
-        synonyms = expand_synonyms(topic_search)
-        filtered = []
-        is_ai_query = topic_search in AI_KEYWORDS
-        for d in documents:
-            all_chunks = [
-                d.page_content.lower(),
-                str(d.metadata.get("content", "")).lower(),
-                str(d.metadata.get("author", "")).lower(),
-                str(d.metadata.get("author_handle", "")).lower()
-            ]
-            match = False
-            for syn in synonyms:
-                pat = re.compile(rf'\b{re.escape(syn)}\b', re.IGNORECASE)
-                if any(pat.search(chunk) for chunk in all_chunks):
-                    match = True
-                    break
-            if is_ai_query and not match and is_ai_related(d.page_content):
-                match = True
-            if match: filtered.append(d)
-        candidates = filtered
+        candidates = [d for d in documents if matches_topic(d, topic_search)]
     if not candidates:
         return None
-    return max(candidates, key=lambda d: int(d.metadata.get("likes", 0) or 0), default=None)
+    return max(candidates, key=lambda d: int(d.metadata.get(metric, 0) or 0), default=None)
 
 def get_most_bookmarked_users(documents, top_n=5):
-    from collections import Counter
-    counts = Counter(d.metadata.get("author", "Unknown") for d in documents)
+    counts = Counter()
+    seen = set()
+    for d in documents:
+        key = tweet_key(d)
+        if key not in seen:
+            seen.add(key)
+            counts[d.metadata.get("author", "Unknown")] += 1
     return counts.most_common(top_n)
 
 def get_most_recent_tweet(documents):
     return documents[0] if documents else None
 
+# Number of distinct tweets returned per answer
+RESULT_K = 5
+
+def rank_tweets(scored_chunks):
+    """Group (chunk, distance) pairs by tweet, ordering tweets by their closest chunk and chunks by distance."""
+    chunks = {}
+    for d, dist in scored_chunks:
+        chunks.setdefault(tweet_key(d), []).append((dist, d))
+    groups = [sorted(pairs, key=lambda pair: pair[0]) for pairs in chunks.values()]
+    groups.sort(key=lambda pairs: pairs[0][0])
+    return [[d for _, d in pairs] for pairs in groups]
+
+# Number of entries kept in each top-k aggregate
+AGGREGATE_TOP_K = 5
+# Engagement metrics with top-k aggregates, globally and per topic
+AGGREGATE_METRICS = ("likes", "views")
+
+class TopK:
+    """Tracks member scores and keeps the k best in a bounded min-heap; ties go to the earliest ingested."""
+
+    def __init__(self, k):
+        self.k = k
+        self.members = {}
+        self._heap = []
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.members)
+
+    def push(self, key, score, seq):
+        self.members[key] = (score, seq)
+        if self._dirty:
+            return
+        heapq.heappush(self._heap, (score, -seq, key))
+        if len(self._heap) > self.k:
+            heapq.heappop(self._heap)
+
+    def remove(self, key):
+        if self.members.pop(key, None) is not None and any(e[2] == key for e in self._heap):
+            # Rebuilt lazily on the next read, only when an evicted top entry forces it
+            self._dirty = True
+
+    def top(self):
+        if self._dirty:
+            self._heap = heapq.nlargest(self.k, ((sc, -seq, key) for key, (sc, seq) in self.members.items()))
+            heapq.heapify(self._heap)
+            self._dirty = False
+        return [key for _, _, key in sorted(self._heap, reverse=True)]
+
+class BookmarkAggregates:
+    """Per-tweet aggregates computed at ingest and kept current on upsert, so ranking intents skip full scans."""
+
+    def __init__(self, documents=(), k=AGGREGATE_TOP_K):
+        self.author_counts = Counter()
+        self._tweets = {}
+        self._seq = 0
+        self._top = {m: TopK(k) for m in AGGREGATE_METRICS}
+        self._topic_top = {m: {t: TopK(k) for t in AGGREGATE_TOPICS} for m in AGGREGATE_METRICS}
+        self.upsert(documents)
+
+    def upsert(self, documents):
+        grouped = {}
+        for d in documents:
+            grouped.setdefault(tweet_key(d), []).append(d)
+        for key, chunks in grouped.items():
+            previous = self._tweets.get(key)
+            if previous:
+                self._remove(key, previous)
+                seq = previous["seq"]
+            else:
+                seq = self._seq
+                self._seq += 1
+            self._add(key, chunks, seq)
+
+    def _add(self, key, chunks, seq):
+        meta = chunks[0].metadata
+        # Match topics once per tweet on its full text rather than once per chunk
+        text = str(meta.get("content", "") or "") or " ".join(c.page_content for c in chunks)
+        author, handle = str(meta.get("author", "")), str(meta.get("author_handle", ""))
+        entry = {
+            "seq": seq,
+            "doc": chunks[0],
+            "author": meta.get("author", "Unknown"),
+            "topics": [t for t in AGGREGATE_TOPICS if text_matches_topic(t, text, author, handle)],
+        }
+        self.author_counts[entry["author"]] += 1
+        for metric in AGGREGATE_METRICS:
+            score = int(meta.get(metric, 0) or 0)
+            self._top[metric].push(key, score, seq)
+            for topic in entry["topics"]:
+                self._topic_top[metric][topic].push(key, score, seq)
+        self._tweets[key] = entry
+
+    def _remove(self, key, entry):
+        self.author_counts[entry["author"]] -= 1
+        if self.author_counts[entry["author"]] <= 0:
+            del self.author_counts[entry["author"]]
+        for metric in AGGREGATE_METRICS:
+            self._top[metric].remove(key)
+            for topic in entry["topics"]:
+                self._topic_top[metric][topic].remove(key)
+        del self._tweets[key]
+
+    def topic_count(self, topic):
+        # Every metric's heap tracks the same members, so any of them gives the tweet count
+        return len(self._topic_top[AGGREGATE_METRICS[0]][topic])
+
+    def topic_counts(self):
+        return {topic: self.topic_count(topic) for topic in AGGREGATE_TOPICS}
+
+    def top_tweets(self, metric="likes", topic=None):
+        heap = self._topic_top[metric][topic] if topic else self._top[metric]
+        return [self._tweets[key]["doc"] for key in heap.top()]
+
+    def most_bookmarked_users(self, top_n=5):
+        return self.author_counts.most_common(top_n)
+
 class SmartAgent:
     def __init__(self, retriever, llm, all_documents):
         self.retriever = retriever
         self.llm = llm
         self.all_docs = all_documents
+        self.aggregates = BookmarkAggregates(all_documents)
+
+    def retrieve_tweet_chunks(self, question, k=RESULT_K):
+        """Return up to k distinct tweets as lists of their retrieved chunks, best match first."""
+        # Embed the query once and widen only the Chroma fetch until k distinct tweets turn up
+        store = self.retriever.vectorstore
+        query_vector = store.embeddings.embed_query(question)
+        search_kwargs = {key: v for key, v in self.retriever.search_kwargs.items() if key in ("filter", "where_document")}
+        fetch_k = max(k * 2, self.retriever.search_kwargs.get("k", 0))
+        while True:
+            # Returns raw Chroma distances (lower is closer), so no relevance conversion is needed
+            hits = store.similarity_search_by_vector_with_relevance_scores(query_vector, k=fetch_k, **search_kwargs)
+            tweets = rank_tweets(hits)
+            if len(tweets) >= k or len(hits) < fetch_k:
+                return tweets[:k]
+            fetch_k *= 2
+
+    def retrieve_tweets(self, question, k=RESULT_K):
+        return [as_whole_tweet(chunks) for chunks in self.retrieve_tweet_chunks(question, k)]
 
     def invoke(self, inputs):
         question = inputs["question"]
         search_space = inputs.get("search_space")
-        docs = search_space if (search_space is not None and len(search_space) > 0) else self.all_docs
+        use_aggregates = not search_space
+        docs = self.all_docs if use_aggregates else search_space
         filters = detect_and_extract_filters(question)
 
-        # --- 🔴🚦 MOST LIKED: GUARD CLAUSE, RETURN IMMEDIATELY ---
-        if filters.get("most_liked"):
+        # --- 🔴🚦 MOST LIKED / MOST VIEWED: GUARD CLAUSE, RETURN IMMEDIATELY ---
+        metric = "likes" if filters.get("most_liked") else "views" if filters.get("most_viewed") else None
+        if metric:
             topic_search = None
-            for k in list(AI_KEYWORDS) + list(TOPIC_SYNONYMS.keys()):
+            for k in AGGREGATE_TOPICS:
                 if re.search(rf'\b{k}\b', question.lower()):
                     topic_search = k
                     break
-            tweet = get_most_liked_tweet(docs, topic_search)
-            if tweet and int(tweet.metadata.get("likes", 0)) > 0:
+            if use_aggregates:
+                top = self.aggregates.top_tweets(metric, topic_search)
+                tweet = top[0] if top else None
+            else:
+                tweet = get_most_liked_tweet(docs, topic_search, metric)
+            if tweet and int(tweet.metadata.get(metric, 0)) > 0:
+                tweet = as_whole_tweet([tweet])
                 return (
-                    f'The most liked tweet{" about " + topic_search if topic_search else ""} is:\n'
+                    f'The most {"liked" if metric == "likes" else "viewed"} tweet'
+                    f'{" about " + topic_search if topic_search else ""} is:\n'
                     f'"{tweet.page_content}" — {tweet.metadata.get("author", "")}, '
                     f'{tweet.metadata.get("likes", 0)} likes, {tweet.metadata.get("views", 0)} views\n'
                     f'Date: {tweet.metadata.get("date", "")}\nURL: {tweet.metadata.get("tweet_url", "")}',
@@ -189,7 +368,10 @@ class SmartAgent:
 
         # SPECIAL: AI broad (top liked for AI questions)
         if entity_asked and entity_asked.lower() in ["ai agents", "ai agent", "ai"]:
-            ai_matches = [t for t in docs if any(re.search(rf"\b{re.escape(k)}\b", t.page_content.lower()) for k in AI_KEYWORDS)]
+            ai_matches = merge_tweets(
+                (t for t in docs if any(re.search(rf"\b{re.escape(k)}\b", t.page_content.lower()) for k in AI_KEYWORDS)),
+                limit=3
+            )
             if not ai_matches:
                 return "No bookmarks found mentioning AI or AI agents.", []
             return (
@@ -201,7 +383,7 @@ class SmartAgent:
             )
         elif entity_asked:
             entity_synonyms = expand_synonyms(entity_asked)
-            strict_matches = strict_entity_filter(docs, entity_synonyms)
+            strict_matches = merge_tweets(strict_entity_filter(docs, entity_synonyms), limit=RESULT_K)
             if not strict_matches:
                 return f"No bookmarks found mentioning {entity_asked}.", []
             return (
@@ -216,6 +398,7 @@ class SmartAgent:
         # ... (unchanged) ...
         if filters.get("sentiment") == "positive" and any(re.search(rf'\b{k}\b', question.lower()) for k in AI_KEYWORDS):
             kind, result_docs = filter_documents(docs, filters, question)
+            result_docs = merge_tweets(result_docs, limit=3)
             if kind == "STRICT_AI":
                 return (
                     "\n".join(
@@ -239,7 +422,7 @@ class SmartAgent:
                 )
             return "No tweets about AI found.", []
         if "topic" in filters:
-            result_docs = filter_documents(docs, filters, question)
+            result_docs = merge_tweets(filter_documents(docs, filters, question), limit=RESULT_K)
             if not result_docs:
                 return f"No bookmarks found related to '{filters['topic']}'.", []
             return (
@@ -252,7 +435,7 @@ class SmartAgent:
                 result_docs[:5]
             )
         if filters.get("ranking") == "user":
-            users = get_most_bookmarked_users(docs)
+            users = self.aggregates.most_bookmarked_users() if use_aggregates else get_most_bookmarked_users(docs)
             return (
                 "You most frequently bookmark these users:\n" + "\n".join(
                     f"{i+1}. {name} ({count} times)" for i, (name, count) in enumerate(users)
@@ -262,6 +445,7 @@ class SmartAgent:
         if filters.get("recency"):
             doc = get_most_recent_tweet(docs)
             if doc:
+                doc = as_whole_tweet([doc])
                 return (
                     f"The most recent bookmarked tweet is:\n"
                     f"\"{doc.page_content}\" — {doc.metadata.get('author', '')}\n"
@@ -270,7 +454,7 @@ class SmartAgent:
                 )
             return "No tweet date information found in your bookmarks.", []
         if any(k in filters for k in ["likes", "views", "sentiment"]):
-            result_docs = filter_documents(docs, filters, question)
+            result_docs = merge_tweets(filter_documents(docs, filters, question))
             if not result_docs:
                 return "No relevant bookmarks found.", []
             return (
@@ -283,8 +467,10 @@ class SmartAgent:
                 sorted(result_docs, key=lambda x: int(x.metadata.get("likes", 0)), reverse=True)[:5]
             )
         if filters.get("summarize"):
-            result_docs = self.retriever.get_relevant_documents(question)
-            context = "\n".join([d.page_content for d in result_docs][:20])
+            tweet_chunks = self.retrieve_tweet_chunks(question)
+            result_docs = [as_whole_tweet(chunks) for chunks in tweet_chunks]
+            # Use each tweet's best-matching chunk so the prompt holds the text that was actually retrieved
+            context = "\n".join(chunks[0].page_content for chunks in tweet_chunks)
             summ_prompt = (
                 "From the following tweets, extract and summarize the main topics, hashtags, and common themes. "
                 "Present a concise, bulleted list (optionally ranked by frequency/popularity).\n"
@@ -292,7 +478,7 @@ class SmartAgent:
             )
             summary = self.llm.invoke(summ_prompt).content
             return summary, result_docs[:5]
-        result_docs = self.retriever.get_relevant_documents(question)
+        result_docs = self.retrieve_tweets(question)
         if not result_docs:
             return "No relevant bookmarks found.", []
         return (
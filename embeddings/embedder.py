@@ -1,8 +1,11 @@
+import io
 import json
 import os
 import uuid
 import tempfile
 import asyncio
+import chromadb
+import numpy as np
 from dotenv import load_dotenv
 
 from langchain_community.vectorstores import Chroma
@@ -16,7 +19,14 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
     raise EnvironmentError("GOOGLE_API_KEY not found in environment. Please check your .env file.")
 
-def create_or_update_knowledge_base(bookmarks):
+EMBED_MODEL = "models/embedding-001"
+# Bump this whenever the layout of exported snapshot files changes
+SNAPSHOT_VERSION = 1
+SNAPSHOT_QUANTIZATIONS = ("float16", "int8")
+# Chroma rejects very large single add() calls, so load snapshots in batches
+CHROMA_ADD_BATCH = 5000
+
+def _ensure_event_loop():
     # This sets up the event loop for Chroma if needed
     try:
         asyncio.get_event_loop()
@@ -24,8 +34,11 @@ def create_or_update_knowledge_base(bookmarks):
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
+def create_or_update_knowledge_base(bookmarks):
+    _ensure_event_loop()
+
     # Set up the embeddings model
-    gemini_embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    gemini_embeddings = GoogleGenerativeAIEmbeddings(model=EMBED_MODEL)
     documents = []
     splitter = RecursiveCharacterTextSplitter(chunk_size=512, chunk_overlap=50)
 
@@ -56,15 +69,100 @@ def create_or_update_knowledge_base(bookmarks):
     collection_name = f"user_{uuid.uuid4().hex[:8]}"
     persist_dir = tempfile.mkdtemp()
 
-    # Store all the embedded tweets in Chroma DB
+    # Store all the embedded tweets in Chroma DB.
+    # Sequential ids keep the original bookmark order recoverable for snapshot export.
     Chroma.from_documents(
         documents,
         embedding=gemini_embeddings,
+        ids=[str(i) for i in range(len(documents))],
         persist_directory=persist_dir,
         collection_name=collection_name,
     )
     return collection_name, gemini_embeddings, persist_dir, documents
 
+def export_knowledge_base(collection_name, persist_dir, quantization="float16"):
+    """Serialize an embedded collection to compact .npz bytes that can be reloaded without re-embedding."""
+    if quantization not in SNAPSHOT_QUANTIZATIONS:
+        raise ValueError(f"Unsupported quantization '{quantization}'. Use one of {SNAPSHOT_QUANTIZATIONS}.")
+
+    collection = chromadb.PersistentClient(path=persist_dir).get_collection(collection_name)
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    order = sorted(range(len(data["ids"])), key=lambda i: int(data["ids"][i]))
+    vectors = np.asarray([data["embeddings"][i] for i in order], dtype=np.float32)
+    records = {
+        "texts": [data["documents"][i] for i in order],
+        "metadatas": [data["metadatas"][i] for i in order],
+    }
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "embedding_model": EMBED_MODEL,
+        "quantization": quantization,
+        "count": len(order),
+        "dim": int(vectors.shape[1]) if vectors.size else 0,
+    }
+
+    arrays = {}
+    if quantization == "int8":
+        # Symmetric per-vector scaling keeps cosine/L2 ranking close to the float32 original
+        scales = np.abs(vectors).max(axis=1, keepdims=True) / 127.0
+        scales[scales == 0] = 1.0
+        arrays["vectors"] = np.round(vectors / scales).astype(np.int8)
+        arrays["scales"] = scales.astype(np.float32)
+    else:
+        arrays["vectors"] = vectors.astype(np.float16)
+
+    buf = io.BytesIO()
+    np.savez_compressed(
+        buf,
+        header=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+        records=np.frombuffer(json.dumps(records).encode("utf-8"), dtype=np.uint8),
+        **arrays,
+    )
+    return buf.getvalue()
+
+def load_knowledge_base_snapshot(uploaded_file):
+    """Rebuild the vector store from an exported snapshot without calling the embedding API."""
+    try:
+        with np.load(io.BytesIO(uploaded_file.read()), allow_pickle=False) as snap:
+            header = json.loads(snap["header"].tobytes().decode("utf-8"))
+            records = json.loads(snap["records"].tobytes().decode("utf-8"))
+            vectors = snap["vectors"].astype(np.float32)
+            if header.get("quantization") == "int8":
+                vectors *= snap["scales"]
+    except Exception as e:
+        print("Failed to read knowledge base snapshot:", e)
+        return None, None, None, None
+
+    if header.get("version") != SNAPSHOT_VERSION:
+        print(f"Unsupported snapshot version {header.get('version')}; expected {SNAPSHOT_VERSION}.")
+        return None, None, None, None
+    if header.get("embedding_model") != EMBED_MODEL:
+        print(f"Snapshot was embedded with {header.get('embedding_model')}, but this app uses {EMBED_MODEL}.")
+        return None, None, None, None
+    texts, metadatas = records.get("texts", []), records.get("metadatas", [])
+    if not texts or len(texts) != len(metadatas) or vectors.shape != (len(texts), header.get("dim")):
+        print("Snapshot contents are inconsistent or empty.")
+        return None, None, None, None
+
+    _ensure_event_loop()
+    # Queries still need the live embedding model; only the stored vectors are reused
+    gemini_embeddings = GoogleGenerativeAIEmbeddings(model=EMBED_MODEL)
+    collection_name = f"user_{uuid.uuid4().hex[:8]}"
+    persist_dir = tempfile.mkdtemp()
+
+    collection = chromadb.PersistentClient(path=persist_dir).get_or_create_collection(collection_name)
+    for start in range(0, len(texts), CHROMA_ADD_BATCH):
+        end = start + CHROMA_ADD_BATCH
+        collection.add(
+            ids=[str(i) for i in range(start, min(end, len(texts)))],
+            embeddings=vectors[start:end].tolist(),
+            documents=texts[start:end],
+            metadatas=metadatas[start:end],
+        )
+
+    documents = [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)]
+    return collection_name, gemini_embeddings, persist_dir, documents
+
 def embed_bookmarks_from_file(uploaded_file):
     # Try to read the uploaded JSON file
     try:
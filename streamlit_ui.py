@@ -1,7 +1,12 @@
 # streamlit_ui.py
 
 import streamlit as st
-from embeddings.embedder import embed_bookmarks_from_file
+from embeddings.embedder import (
+    SNAPSHOT_QUANTIZATIONS,
+    embed_bookmarks_from_file,
+    export_knowledge_base,
+    load_knowledge_base_snapshot,
+)
 from chatbot.agent_langchain import build_agent
 
 # Number of tweets to remember for follow-ups
@@ -31,26 +36,62 @@ st.sidebar.write(
     "This app lets you search and browse your exported Twitter bookmarks.\n\n"
     "To use:\n"
     "1. Upload your `bookmarks.json` file\n"
-    "2. Ask simple questions about your saved tweets."
+    "2. Ask simple questions about your saved tweets.\n\n"
+    "Download the knowledge base snapshot after embedding and upload it next time "
+    "to skip the embedding step."
 )
 st.sidebar.markdown("**Example questions:**")
 st.sidebar.markdown("- Show my most recent bookmark")
 st.sidebar.markdown("- List tweets about cricket")
 st.sidebar.markdown("- Show tweets about Elon Musk")
 st.sidebar.markdown("- Show my most liked tweet about Cricket")
+st.sidebar.markdown("- Who are my most bookmarked users?")
 
-uploaded_file = st.file_uploader("📤 Upload your Twitter `bookmarks.json` file", type="json")
+uploaded_file = st.file_uploader(
+    "📤 Upload your Twitter `bookmarks.json` file or a saved knowledge base snapshot (`.npz`)",
+    type=["json", "npz"],
+)
 
 if uploaded_file:
-    with st.spinner("Processing your bookmarks..."):
-        collection_name, embedding_function, persist_dir, all_docs = embed_bookmarks_from_file(uploaded_file)
+    is_snapshot = uploaded_file.name.lower().endswith(".npz")
+    # Streamlit reruns this script on every interaction, so build the knowledge base once per upload
+    upload_key = uploaded_file.file_id
+    if st.session_state.get("kb_upload_key") != upload_key:
+        with st.spinner("Loading your knowledge base snapshot..." if is_snapshot else "Processing your bookmarks..."):
+            if is_snapshot:
+                st.session_state.kb = load_knowledge_base_snapshot(uploaded_file)
+            else:
+                st.session_state.kb = embed_bookmarks_from_file(uploaded_file)
+        st.session_state.kb_upload_key = upload_key
+        st.session_state.kb_exports = {}
+    collection_name, embedding_function, persist_dir, all_docs = st.session_state.kb
 
     if collection_name is None or all_docs is None:
-        st.error("Could not process the uploaded file. Please upload a valid bookmarks JSON.")
+        if is_snapshot:
+            st.error("Could not load the snapshot. It may be corrupted or built with a different embedding model.")
+        else:
+            st.error("Could not process the uploaded file. Please upload a valid bookmarks JSON.")
         st.stop()
     else:
         st.success(f"{len(all_docs)} bookmarks loaded. You can now chat!")
-        chain = build_agent(collection_name, embedding_function, persist_dir, all_docs)
+        if not is_snapshot:
+            quantization = st.sidebar.radio("Snapshot precision", SNAPSHOT_QUANTIZATIONS, horizontal=True)
+            # Exporting reads every embedding back out of Chroma, so only do it when the user asks
+            if quantization not in st.session_state.kb_exports and st.sidebar.button("📦 Prepare knowledge base snapshot"):
+                with st.spinner("Preparing snapshot..."):
+                    st.session_state.kb_exports[quantization] = export_knowledge_base(collection_name, persist_dir, quantization)
+            if quantization in st.session_state.kb_exports:
+                st.sidebar.download_button(
+                    "💾 Download knowledge base snapshot",
+                    data=st.session_state.kb_exports[quantization],
+                    file_name="bookmarks_kb.npz",
+                    mime="application/octet-stream",
+                )
+        # Build the agent (and its ingest-time aggregates) once per upload, not on every rerun
+        if st.session_state.get("agent_upload_key") != upload_key:
+            st.session_state.chain = build_agent(collection_name, embedding_function, persist_dir, all_docs)
+            st.session_state.agent_upload_key = upload_key
+        chain = st.session_state.chain
 
         if "chat_history" not in st.session_state:
             st.session_state.chat_history = []